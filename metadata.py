@@ -8,16 +8,22 @@ version: 1.0
 import exiftool
 from PIL import Image, PngImagePlugin
 from pathlib import Path
+import csv
+import json
 import os
+import re
 
 exiftool_path = Path(r"\exiftool.exe").resolve()
 
-def set_metadata_jpg(image_path, metadata):
-    import exiftool
-    exiftool_path = Path(r"\exiftool.exe").resolve()
-    with exiftool.ExifTool(str(exiftool_path)) as et:
-        args = [f"-{k}={v}" for k, v in metadata.items()] + [image_path]
-        et.execute(*args)
+SUPPORTED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif")
+CHUNK_SIZE = 500
+
+def set_metadata_jpg(image_path, metadata, et=None):
+    if et is None:
+        with exiftool.ExifTool(str(exiftool_path)) as et:
+            return set_metadata_jpg(image_path, metadata, et)
+    args = [f"-{k}={v}" for k, v in metadata.items()] + [image_path]
+    et.execute(*args)
     print(f"Metadata for {image_path} (JPEG) updated!")
 
 def set_metadata_png(image_path, metadata):
@@ -31,53 +37,242 @@ def set_metadata_png(image_path, metadata):
     img.save(image_path, "PNG", pnginfo=pnginfo)
     print(f"Metadata for {image_path} (PNG) updated!")
 
-def set_metadata_gif(image_path, metadata):
-    import exiftool
-    exiftool_path = Path(r"\exiftool.exe").resolve()
-    with exiftool.ExifTool(str(exiftool_path)) as et:
-        args = [f"-XMP:{k}={v}" for k, v in metadata.items()] + [image_path]
-        et.execute(*args)
+def set_metadata_gif(image_path, metadata, et=None):
+    if et is None:
+        with exiftool.ExifTool(str(exiftool_path)) as et:
+            return set_metadata_gif(image_path, metadata, et)
+    args = [f"-XMP:{k}={v}" for k, v in metadata.items()] + [image_path]
+    et.execute(*args)
     print(f"Metadata for {image_path} (GIF) updated!")
 
-def set_metadata(image_path, metadata):
+def set_metadata(image_path, metadata, et=None):
     ext = os.path.splitext(image_path)[1].lower()
     if ext in [".jpg", ".jpeg"]:
-        set_metadata_jpg(image_path, metadata)
+        set_metadata_jpg(image_path, metadata, et)
     elif ext == ".png":
         set_metadata_png(image_path, metadata)
     elif ext == ".gif":
-        set_metadata_gif(image_path, metadata)
+        set_metadata_gif(image_path, metadata, et)
     else:
         print(f"Unsupported format: {ext}")
 
-def read_metadata_from_txt(file_path):
-    metadata_dict = {}
-    with open(file_path, "r", encoding="utf-8") as file:
-        for line in file:
-            parts = line.strip().split("|")
-            if len(parts) < 2:
+# Every manifest reader yields (line_no, image_name, metadata, error) tuples.
+# Malformed rows carry an error message instead of metadata so the caller can
+# report them without the reader having to stop. Manifests are opened with
+# surrogateescape so a bad byte is reported on its own row instead of aborting
+# the run after earlier chunks were already written.
+
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+INVALID_UTF8 = "invalid UTF-8"
+
+# Long descriptions easily exceed the default limit of 131072 characters.
+csv.field_size_limit(2**31 - 1)
+
+def split_fields(line):
+    # "|" separates fields, "\|" is a literal pipe inside a value.
+    fields = [""]
+    i = 0
+    while i < len(line):
+        if line.startswith("\\|", i):
+            fields[-1] += "|"
+            i += 2
+            continue
+        if line[i] == "|":
+            fields.append("")
+        else:
+            fields[-1] += line[i]
+        i += 1
+    return fields
+
+def parse_txt_entry(line_no, text):
+    if UNDECODABLE.search(text):
+        return line_no, None, None, INVALID_UTF8
+    fields = split_fields(text)
+    head = fields[0].strip()
+    if not head or "=" in head:
+        return line_no, None, None, 'missing image name, expected "image | Key=value"'
+    metadata = {}
+    for field in fields[1:]:
+        if not field.strip():
+            continue
+        key, sep, value = field.partition("=")
+        if not sep or not key.strip():
+            return line_no, head, None, f'field without "Key=" ({field.strip()!r}), write a literal "|" as "\\|"'
+        metadata[key.strip()] = value.strip()
+    if not metadata:
+        return line_no, head, None, 'no "Key=value" fields'
+    return line_no, head, metadata, None
+
+def iter_metadata_txt(file_path):
+    # Pipe-delimited format: "image | Key=value | Key=value".
+    # A literal "|" in a value is written as "\|"; everything after the first
+    # "=" of a field belongs to the value. A line ending in "\" continues on
+    # the next line, the line break is kept in the value.
+    start = None
+    with open(file_path, "r", encoding="utf-8-sig", errors="surrogateescape") as file:
+        for line_no, line in enumerate(file, 1):
+            line = line.rstrip("\r\n")
+            if start is None:
+                if not line.strip():
+                    continue
+                start, text = line_no, ""
+            if line.endswith("\\"):
+                text += line[:-1] + "\n"
+                continue
+            yield parse_txt_entry(start, text + line)
+            start = None
+    if start is not None:
+        yield parse_txt_entry(start, text)
+
+def stringify_json_value(value):
+    # JSON spelling for true/false/numbers, null clears the tag like "Key=".
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+def iter_metadata_jsonl(file_path):
+    # One object per line: {"image": "1.png", "Description": "..."}
+    with open(file_path, "r", encoding="utf-8-sig", errors="surrogateescape") as file:
+        for line_no, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            if UNDECODABLE.search(line):
+                yield line_no, None, None, INVALID_UTF8
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, None, None, f"invalid JSON ({e.msg})"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, None, "expected a JSON object"
+                continue
+            image_name = record.pop("image", None)
+            if not isinstance(image_name, str) or not image_name.strip():
+                yield line_no, None, None, "missing image name"
                 continue
-            image_file = parts[0].strip()
-            metadata = {}
-            for entry in parts[1:]:
-                if "=" not in entry:
+            image_name = image_name.strip()
+            if any(not key.strip() for key in record):
+                yield line_no, image_name, None, "empty key"
+                continue
+            nested = [key for key, value in record.items() if isinstance(value, (dict, list))]
+            if nested:
+                yield line_no, image_name, None, f"nested value for {nested[0].strip()}"
+                continue
+            if not record:
+                yield line_no, image_name, None, "no metadata fields"
+                continue
+            metadata = {key.strip(): stringify_json_value(value) for key, value in record.items()}
+            yield line_no, image_name, metadata, None
+
+def iter_metadata_csv(file_path):
+    # Header row with an "image" column, every other column is a metadata key.
+    # Quoted fields may contain commas, pipes and newlines. Empty cells leave
+    # the tag unchanged, since not every column applies to every image.
+    with open(file_path, "r", encoding="utf-8-sig", errors="surrogateescape", newline="") as file:
+        reader = csv.DictReader(file)
+        line_no = 1
+        try:
+            if reader.fieldnames is not None:
+                reader.fieldnames = [name.strip() for name in reader.fieldnames]
+            if not reader.fieldnames or "image" not in reader.fieldnames:
+                yield 1, None, None, 'header has no "image" column'
+                return
+            if UNDECODABLE.search("".join(reader.fieldnames)):
+                yield 1, None, None, f"{INVALID_UTF8} in header"
+                return
+            line_no = reader.line_num + 1
+            for row in reader:
+                start, line_no = line_no, reader.line_num + 1
+                if None in row:
+                    yield start, row.get("image"), None, "more fields than header columns"
                     continue
-                key, value = entry.split("=", 1)  
-                metadata[key.strip()] = value.strip()
-            metadata_dict[image_file] = metadata
-    return metadata_dict
-
-def process_metadata_file(txt_file, image_directory):
-    metadata_entries = read_metadata_from_txt(txt_file)
-
-    for image_name, metadata in metadata_entries.items():
-        image_path = os.path.join(image_directory, image_name)
-        if os.path.isfile(image_path):
-            set_metadata(image_path, metadata)
-        else:
-            print(f"File not found: {image_path}")
+                if None in row.values():
+                    yield start, row.get("image"), None, "fewer fields than header columns"
+                    continue
+                if UNDECODABLE.search("".join(row.values())):
+                    yield start, None, None, INVALID_UTF8
+                    continue
+                image_name = row.pop("image").strip()
+                if not image_name:
+                    yield start, None, None, "missing image name"
+                    continue
+                metadata = {k: v.strip() for k, v in row.items() if k and v.strip()}
+                if not metadata:
+                    yield start, image_name, None, "no metadata values"
+                    continue
+                yield start, image_name, metadata, None
+        except csv.Error as e:
+            yield line_no, None, None, f"invalid CSV ({e}), rest of the file was not processed"
+
+MANIFEST_READERS = {
+    ".txt": iter_metadata_txt,
+    ".jsonl": iter_metadata_jsonl,
+    ".csv": iter_metadata_csv,
+}
+
+def iter_manifest(file_path, image_directory=None):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in MANIFEST_READERS:
+        raise ValueError(f"Unsupported manifest format: {ext}")
+    # Only image names are kept, so memory grows with the number of distinct
+    # images rather than with the size of the metadata.
+    seen = {}
+    for line_no, image_name, metadata, error in MANIFEST_READERS[ext](file_path):
+        if error is None and not image_name.lower().endswith(SUPPORTED_EXTENSIONS):
+            error = f"unsupported format: {os.path.splitext(image_name)[1].lower() or image_name}"
+        elif error is None and image_name in seen:
+            error = f"duplicate entry for {image_name} (first on line {seen[image_name]})"
+        elif error is None and image_directory is not None \
+                and not os.path.isfile(os.path.join(image_directory, image_name)):
+            error = f"file not found: {os.path.join(image_directory, image_name)}"
+        if error is not None:
+            print(f"{file_path}:{line_no}: {error}, skipped")
+            continue
+        seen[image_name] = line_no
+        yield image_name, metadata
+
+def iter_chunks(entries, chunk_size=CHUNK_SIZE):
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def read_metadata_from_txt(file_path):
+    return {
+        image_name: metadata
+        for _, image_name, metadata, error in iter_metadata_txt(file_path)
+        if error is None
+    }
+
+def write_metadata_chunk(chunk, image_directory):
+    # One ExifTool process per chunk instead of one per JPEG/GIF.
+    needs_exiftool = any(
+        os.path.splitext(name)[1].lower() in (".jpg", ".jpeg", ".gif") for name, _ in chunk
+    )
+    if not needs_exiftool:
+        for image_name, metadata in chunk:
+            set_metadata(os.path.join(image_directory, image_name), metadata)
+        return
+    with exiftool.ExifTool(str(exiftool_path)) as et:
+        for image_name, metadata in chunk:
+            set_metadata(os.path.join(image_directory, image_name), metadata, et)
+
+def process_metadata_file(manifest_file, image_directory, chunk_size=CHUNK_SIZE):
+    written = 0
+    for chunk in iter_chunks(iter_manifest(manifest_file, image_directory), chunk_size):
+        write_metadata_chunk(chunk, image_directory)
+        written += len(chunk)
+    print(f"{written} images updated from {manifest_file}")
 
-txt_file = r'\metadata.txt'
-image_directory = r'\images' 
+if __name__ == "__main__":
+    txt_file = r'\metadata.txt'
+    image_directory = r'\images' 
 
-process_metadata_file(txt_file, image_directory)
+    process_metadata_file(txt_file, image_directory)
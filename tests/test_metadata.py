@@ -0,0 +1,212 @@
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.modules.setdefault("exiftool", types.ModuleType("exiftool"))
+
+import metadata
+
+
+def write_manifest(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8", newline="")
+    return str(path)
+
+
+def read(path, image_directory=None):
+    return dict(metadata.iter_manifest(path, image_directory))
+
+
+def test_txt_template_format(tmp_path):
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description= |\n2.png | Description=b | Title=t\n")
+    assert read(path) == {"1.png": {"Description": ""}, "2.png": {"Description": "b", "Title": "t"}}
+
+
+def test_txt_continuation_lines(tmp_path):
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description=first\\\nsecond = line | Title=t\n2.png | Description=x\n")
+    assert read(path) == {"1.png": {"Description": "first\nsecond = line", "Title": "t"}, "2.png": {"Description": "x"}}
+
+
+def test_txt_line_without_entry_is_reported(tmp_path, capsys):
+    path = write_manifest(
+        tmp_path,
+        "m.txt",
+        "1.png | Description=hello\n2.png Description=oops\n3.png | Description: bad\nKeywords=cat\n4.png | Description=x\n",
+    )
+    assert read(path) == {"1.png": {"Description": "hello"}, "4.png": {"Description": "x"}}
+    out = capsys.readouterr().out
+    assert "m.txt:2: missing image name" in out
+    assert "m.txt:3: field without" in out
+    assert "m.txt:4: missing image name" in out
+
+
+def test_txt_reads_bom_and_reports_bad_bytes(tmp_path, capsys):
+    path = tmp_path / "m.txt"
+    path.write_bytes(b"\xef\xbb\xbf1.png | Description=a\n2.png | Description=\xff\n3.png | Description=c\n")
+    assert read(str(path)) == {"1.png": {"Description": "a"}, "3.png": {"Description": "c"}}
+    assert "m.txt:2: invalid UTF-8" in capsys.readouterr().out
+
+
+def test_read_metadata_from_txt_keeps_old_contract(tmp_path):
+    path = write_manifest(tmp_path, "m.dat", "1.webp | Description=a\n1.webp | Description=b\n")
+    assert metadata.read_metadata_from_txt(path) == {"1.webp": {"Description": "b"}}
+
+
+def test_txt_unsupported_row_is_not_a_continuation(tmp_path, capsys):
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description=hello\n4.webp | Description=webp image\n")
+    assert read(path) == {"1.png": {"Description": "hello"}}
+    assert "m.txt:2: unsupported format: .webp" in capsys.readouterr().out
+
+
+def test_txt_escaped_pipe_in_value(tmp_path):
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description=a \\| Foo=bar | Title=a=b\n")
+    assert read(path) == {"1.png": {"Description": "a | Foo=bar", "Title": "a=b"}}
+
+
+def test_txt_field_without_key_is_reported(tmp_path, capsys):
+    path = write_manifest(tmp_path, "m.txt", "1.png | note | Description=x\n2.png | Description=y\n")
+    assert read(path) == {"2.png": {"Description": "y"}}
+    assert "m.txt:1: field without" in capsys.readouterr().out
+
+
+def test_txt_duplicates_keep_first(tmp_path, capsys):
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description=a\n1.png | Description=b\n")
+    assert read(path) == {"1.png": {"Description": "a"}}
+    assert "m.txt:2: duplicate entry for 1.png (first on line 1)" in capsys.readouterr().out
+
+
+def test_missing_file_is_reported(tmp_path, capsys):
+    (tmp_path / "1.png").touch()
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description=a\n2.png | Description=b\n")
+    assert read(path, str(tmp_path)) == {"1.png": {"Description": "a"}}
+    assert "m.txt:2: file not found" in capsys.readouterr().out
+
+
+def test_csv_quoted_fields(tmp_path):
+    path = write_manifest(tmp_path, "m.csv", 'image,Description\n1.png,"a,b|c\nd"\n2.png,e\n')
+    assert read(path) == {"1.png": {"Description": "a,b|c\nd"}, "2.png": {"Description": "e"}}
+
+
+def test_csv_short_and_long_rows(tmp_path, capsys):
+    path = write_manifest(tmp_path, "m.csv", "image,Description,Title\n1.png,a,b,c\n2.png,short\n3.png,d,t\n")
+    assert read(path) == {"3.png": {"Description": "d", "Title": "t"}}
+    out = capsys.readouterr().out
+    assert "m.csv:2: more fields than header columns" in out
+    assert "m.csv:3: fewer fields than header columns" in out
+
+
+def test_csv_error_stops_with_message(tmp_path, capsys):
+    path = write_manifest(tmp_path, "m.csv", "image,Description\n1.png,a\n2.png," + "b" * 20 + "\n3.png,c\n")
+    field_size_limit = metadata.csv.field_size_limit(15)
+    try:
+        assert read(path) == {"1.png": {"Description": "a"}}
+    finally:
+        metadata.csv.field_size_limit(field_size_limit)
+    assert "rest of the file was not processed" in capsys.readouterr().out
+
+
+def test_csv_empty_cells_leave_tags_unchanged(tmp_path, capsys):
+    path = write_manifest(tmp_path, "m.csv", "image,Description,Title\n1.png,a,\n2.png,,\n")
+    assert read(path) == {"1.png": {"Description": "a"}}
+    assert "m.csv:3: no metadata values" in capsys.readouterr().out
+
+
+def test_csv_bom_and_padded_header(tmp_path):
+    path = tmp_path / "m.csv"
+    path.write_bytes("\ufeff image , Description \r\n1.png,a\r\n".encode("utf-8"))
+    assert read(str(path)) == {"1.png": {"Description": "a"}}
+
+
+def test_csv_bad_bytes_are_reported(tmp_path, capsys):
+    path = tmp_path / "m.csv"
+    path.write_bytes(b"image,Description\n1.png,\xff\n2.png,b\n")
+    assert read(str(path)) == {"2.png": {"Description": "b"}}
+    assert "m.csv:2: invalid UTF-8" in capsys.readouterr().out
+
+
+def test_csv_long_field(tmp_path):
+    description = "x" * 200000
+    path = write_manifest(tmp_path, "m.csv", f"image,Description\n1.png,{description}\n")
+    assert read(path) == {"1.png": {"Description": description}}
+
+
+def test_jsonl_values_and_invalid_lines(tmp_path, capsys):
+    path = write_manifest(
+        tmp_path,
+        "m.jsonl",
+        '{"image": "1.png", "Description": "a", "Rating": 5, "Flag": true, "Title": null}\n'
+        "{bad\n"
+        '{"image": "2.png", "Keywords": ["a"]}\n'
+        '["3.png"]\n',
+    )
+    assert read(path) == {"1.png": {"Description": "a", "Rating": "5", "Flag": "true", "Title": ""}}
+    out = capsys.readouterr().out
+    assert "m.jsonl:2: invalid JSON" in out
+    assert "m.jsonl:3: nested value for Keywords" in out
+    assert "m.jsonl:4: expected a JSON object" in out
+
+
+def test_jsonl_keys_are_validated_and_stripped(tmp_path, capsys):
+    path = tmp_path / "m.jsonl"
+    path.write_bytes(
+        b'{"image": "1.png", "": "x"}\n'
+        b'{"image": "2.png", " Title ": "t"}\n'
+        b'{"image": "3.png", "Title": "\xff"}\n'
+    )
+    assert read(str(path)) == {"2.png": {"Title": "t"}}
+    out = capsys.readouterr().out
+    assert "m.jsonl:1: empty key" in out
+    assert "m.jsonl:3: invalid UTF-8" in out
+
+
+def test_process_writes_in_chunks(tmp_path, monkeypatch, capsys):
+    for name in ("1.png", "2.png", "3.png"):
+        (tmp_path / name).touch()
+    path = write_manifest(tmp_path, "m.txt", "1.png | Description=a\n2.png | Description=b\n3.png | Description=c\n")
+    chunks = []
+    monkeypatch.setattr(metadata, "write_metadata_chunk", lambda chunk, directory: chunks.append(chunk))
+    metadata.process_metadata_file(path, str(tmp_path), chunk_size=2)
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert "3 images updated" in capsys.readouterr().out
+
+
+class FakeExifTool:
+    instances = []
+
+    def __init__(self, executable):
+        self.calls = []
+        FakeExifTool.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, *args):
+        self.calls.append(args)
+
+
+def test_exiftool_is_shared_per_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata.exiftool, "ExifTool", FakeExifTool, raising=False)
+    monkeypatch.setattr(FakeExifTool, "instances", [])
+    for name in ("1.jpg", "2.gif", "3.jpeg"):
+        (tmp_path / name).touch()
+    path = write_manifest(tmp_path, "m.txt", "1.jpg | Title=a\n2.gif | Title=b\n3.jpeg | Title=c\n")
+    metadata.process_metadata_file(path, str(tmp_path), chunk_size=2)
+    assert [instance.calls for instance in FakeExifTool.instances] == [
+        [("-Title=a", str(tmp_path / "1.jpg")), ("-XMP:Title=b", str(tmp_path / "2.gif"))],
+        [("-Title=c", str(tmp_path / "3.jpeg"))],
+    ]
+
+
+def test_set_metadata_opens_exiftool_without_shared_instance(monkeypatch):
+    monkeypatch.setattr(metadata.exiftool, "ExifTool", FakeExifTool, raising=False)
+    monkeypatch.setattr(FakeExifTool, "instances", [])
+    metadata.set_metadata("a.jpg", {"Title": "a"})
+    metadata.set_metadata("b.gif", {"Title": "b"})
+    assert [instance.calls for instance in FakeExifTool.instances] == [
+        [("-Title=a", "a.jpg")],
+        [("-XMP:Title=b", "b.gif")],
+    ]